@@ -3,9 +3,8 @@ Centralized configuration for X Bot Agent.
 Handles environment variables, API clients, and bot settings.
 """
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-import tweepy
-import google.generativeai as genai
 
 # Load environment variables
 load_dotenv()
@@ -32,8 +31,10 @@ def validate_x_credentials():
     return True
 
 # Initialize X API client
+@lru_cache(maxsize=1)
 def get_x_client():
-    """Get authenticated Tweepy client."""
+    """Get authenticated Tweepy client (created once, then reused)."""
+    import tweepy  # Deferred: heavy import only needed when posting
     validate_x_credentials()
     return tweepy.Client(
         consumer_key=X_API_KEY,
@@ -55,12 +56,19 @@ def validate_gemini_credentials():
         raise ValueError("Missing GEMINI_API_KEY in environment variables")
     return True
 
+@lru_cache(maxsize=1)
 def get_gemini_model():
-    """Get configured Gemini model."""
+    """Get configured Gemini model (created once, then reused)."""
+    import google.generativeai as genai  # Deferred: heavy import only needed when generating
     validate_gemini_credentials()
     genai.configure(api_key=GEMINI_API_KEY)
     return genai.GenerativeModel(GEMINI_MODEL)
 
+def reset_clients():
+    """Drop cached API clients so the next call builds fresh ones."""
+    get_x_client.cache_clear()
+    get_gemini_model.cache_clear()
+
 # =============================================================================
 # Rate Limiting Configuration
 # =============================================================================
@@ -2,136 +2,310 @@
 Consolidated database module for X Bot Agent.
 Handles all database operations with proper context management.
 """
+import hashlib
+import re
 import sqlite3
 import time
 import logging
 from contextlib import contextmanager
 from typing import Optional, List, Tuple
-from config import DB_NAME, LOG_FILE
-
-# Configure logging
-logging.basicConfig(filename=LOG_FILE, level=logging.ERROR)
+import db_pool
 
 # =============================================================================
 # Database Connection Management
 # =============================================================================
 
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections with proper error handling."""
-    conn = None
+def get_db_connection(write: bool = False):
+    """
+    Context manager for pooled database connections with error logging.
+    Use write=True for statements that modify the database.
+    """
+    with db_pool.get_db_connection(write=write) as conn:
+        try:
+            yield conn
+        except sqlite3.Error as e:
+            # Inside batch_writes() the batch decides whether to roll back
+            if conn.in_transaction and not db_pool.pool.in_transaction():
+                conn.rollback()
+            logging.error(f"Database error: {e}")
+            raise
+
+@contextmanager
+def batch_writes():
+    """
+    Group several write helpers into a single transaction and commit.
+    Rolls back everything on exception. Use around loops that record many rows.
+    """
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access
-        yield conn
+        with db_pool.pool.transaction() as conn:
+            yield conn
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        logging.error(f"Database error: {e}")
+        logging.error(f"Batch write failed: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
+
+# Bump when SCHEMA changes so existing databases re-run it on next start
+SCHEMA_VERSION = 2
+
+SCHEMA = '''
+BEGIN IMMEDIATE;
+
+-- Table for tracking monthly post counts (rate limiting)
+CREATE TABLE IF NOT EXISTS post_counts (
+    id INTEGER PRIMARY KEY,
+    month TEXT UNIQUE,
+    count INTEGER DEFAULT 0
+);
+
+-- Table for tracking posted tweet content (duplicate prevention)
+CREATE TABLE IF NOT EXISTS posted_tweets (
+    id INTEGER PRIMARY KEY,
+    content_hash BLOB UNIQUE,  -- raw 16-byte BLAKE2b digest
+    tweet_id TEXT,
+    posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- SimHash fingerprints of posted tweets (near-duplicate detection),
+-- split into four 16-bit bands for indexed candidate lookup
+CREATE TABLE IF NOT EXISTS tweet_fingerprints (
+    posted_tweet_id INTEGER PRIMARY KEY REFERENCES posted_tweets(id),
+    simhash INTEGER,
+    band0 INTEGER,
+    band1 INTEGER,
+    band2 INTEGER,
+    band3 INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_band0 ON tweet_fingerprints(band0);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_band1 ON tweet_fingerprints(band1);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_band2 ON tweet_fingerprints(band2);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_band3 ON tweet_fingerprints(band3);
+
+-- Table for tracking processed mentions
+CREATE TABLE IF NOT EXISTS processed_mentions (
+    id INTEGER PRIMARY KEY,
+    tweet_id TEXT UNIQUE,
+    author_id TEXT,
+    author_username TEXT,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table for tracking retweets
+CREATE TABLE IF NOT EXISTS retweet_log (
+    id INTEGER PRIMARY KEY,
+    original_tweet_id TEXT UNIQUE,
+    retweeted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_quote_retweet BOOLEAN DEFAULT 0
+);
+
+-- Indexes for time-window queries (lookup columns are already UNIQUE)
+CREATE INDEX IF NOT EXISTS idx_posted_at ON posted_tweets(posted_at);
+CREATE INDEX IF NOT EXISTS idx_retweet_at ON retweet_log(retweeted_at);
+
+-- Give the query planner statistics for the new indexes
+ANALYZE;
+
+COMMIT;
+'''
+
+def _migrate_content_hash_to_blob(conn: sqlite3.Connection):
+    """Version 2: convert hex TEXT content hashes to raw digest BLOBs."""
+    rows = conn.execute(
+        "SELECT id, content_hash FROM posted_tweets WHERE typeof(content_hash) = 'text'"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE posted_tweets SET content_hash = ? WHERE id = ?",
+        [(bytes.fromhex(row['content_hash']), row['id']) for row in rows]
+    )
 
 def init_db():
-    """Initialize all database tables."""
+    """Initialize all database tables, skipping the DDL if already up to date."""
     with get_db_connection() as conn:
-        c = conn.cursor()
-        
-        # Table for tracking monthly post counts (rate limiting)
-        c.execute('''CREATE TABLE IF NOT EXISTS post_counts (
-            id INTEGER PRIMARY KEY,
-            month TEXT UNIQUE,
-            count INTEGER DEFAULT 0
-        )''')
-        
-        # Table for tracking posted tweet content (duplicate prevention)
-        c.execute('''CREATE TABLE IF NOT EXISTS posted_tweets (
-            id INTEGER PRIMARY KEY,
-            content_hash TEXT UNIQUE,
-            tweet_id TEXT,
-            posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-        
-        # Table for tracking processed mentions
-        c.execute('''CREATE TABLE IF NOT EXISTS processed_mentions (
-            id INTEGER PRIMARY KEY,
-            tweet_id TEXT UNIQUE,
-            author_id TEXT,
-            author_username TEXT,
-            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-        
-        # Table for tracking retweets
-        c.execute('''CREATE TABLE IF NOT EXISTS retweet_log (
-            id INTEGER PRIMARY KEY,
-            original_tweet_id TEXT UNIQUE,
-            retweeted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_quote_retweet BOOLEAN DEFAULT 0
-        )''')
-        
-        conn.commit()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return
+    
+    # DDL is idempotent, so it is safe to re-run if a migration below fails
+    with get_db_connection(write=True) as conn:
+        conn.executescript(SCHEMA)
+    
+    with batch_writes() as conn:
+        if version < 2:
+            _migrate_content_hash_to_blob(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+# =============================================================================
+# SQL Statements
+# =============================================================================
+# Fixed statement strings so every call hits the same entry in the
+# connection's prepared-statement cache.
+
+_SQL_GET_POST_COUNT = "SELECT count FROM post_counts WHERE month=?"
+_SQL_RESERVE_POST_SLOT = (
+    "INSERT INTO post_counts (month, count) VALUES (?, 1) "
+    "ON CONFLICT(month) DO UPDATE SET count = count + 1 WHERE count < ? "
+    "RETURNING count"
+)
+_SQL_RELEASE_POST_SLOT = "UPDATE post_counts SET count = count - 1 WHERE month=? AND count > 0"
+_SQL_HAS_POSTED = "SELECT 1 FROM posted_tweets WHERE content_hash IN (?, ?)"
+_SQL_RECORD_POSTED = "INSERT OR IGNORE INTO posted_tweets (content_hash, tweet_id) VALUES (?, ?)"
+_SQL_RECORD_FINGERPRINT = (
+    "INSERT OR IGNORE INTO tweet_fingerprints "
+    "(posted_tweet_id, simhash, band0, band1, band2, band3) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_SQL_SIMILAR_FINGERPRINTS = (
+    "SELECT simhash FROM tweet_fingerprints "
+    "WHERE band0=? OR band1=? OR band2=? OR band3=?"
+)
+_SQL_HAS_PROCESSED_MENTION = "SELECT 1 FROM processed_mentions WHERE tweet_id=?"
+_SQL_MARK_MENTION_PROCESSED = (
+    "INSERT OR IGNORE INTO processed_mentions (tweet_id, author_id, author_username) "
+    "VALUES (?, ?, ?)"
+)
+_SQL_HAS_RETWEETED = "SELECT 1 FROM retweet_log WHERE original_tweet_id=?"
+_SQL_RECORD_RETWEET = "INSERT OR IGNORE INTO retweet_log (original_tweet_id, is_quote_retweet) VALUES (?, ?)"
+_SQL_BOT_STATS = """
+    SELECT
+        (SELECT count FROM post_counts WHERE month=?) AS current_month_posts,
+        (SELECT COUNT(*) FROM posted_tweets) AS total_tweets,
+        (SELECT COUNT(*) FROM processed_mentions) AS total_mentions,
+        (SELECT COUNT(*) FROM retweet_log) AS total_retweets
+"""
 
 # =============================================================================
 # Post Count Operations (Rate Limiting)
 # =============================================================================
 
+_current_month: Optional[str] = None
+_current_month_expires = 0.0
+
 def get_current_month() -> str:
-    """Get current month in YYYY-MM format."""
-    return time.strftime("%Y-%m")
+    """Get current month in YYYY-MM format (cached until the month rolls over)."""
+    global _current_month, _current_month_expires
+    now = time.time()
+    if now >= _current_month_expires:
+        local = time.localtime(now)
+        _current_month = time.strftime("%Y-%m", local)
+        if local.tm_mon == 12:
+            next_year, next_month = local.tm_year + 1, 1
+        else:
+            next_year, next_month = local.tm_year, local.tm_mon + 1
+        _current_month_expires = time.mktime((next_year, next_month, 1, 0, 0, 0, 0, 0, -1))
+    return _current_month
 
 def get_post_count() -> int:
     """Get current month's post count."""
     with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT count FROM post_counts WHERE month=?", (get_current_month(),))
-        result = c.fetchone()
+        result = conn.execute(_SQL_GET_POST_COUNT, (get_current_month(),)).fetchone()
         return result['count'] if result else 0
 
-def increment_post_count() -> bool:
-    """Increment current month's post count. Returns True on success."""
+def reserve_post_slot(limit: int) -> Optional[int]:
+    """
+    Atomically claim one of this month's posts if fewer than `limit` are used.
+    Returns the new count, or None if the limit is reached.
+    Database errors are raised so callers don't mistake them for the limit.
+    """
+    with get_db_connection(write=True) as conn:
+        result = conn.execute(_SQL_RESERVE_POST_SLOT, (get_current_month(), limit)).fetchone()
+        return result['count'] if result else None
+
+def release_post_slot() -> bool:
+    """Give back a slot claimed by reserve_post_slot(), e.g. when posting fails."""
     try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            current_month = get_current_month()
-            c.execute("""
-                INSERT INTO post_counts (month, count) VALUES (?, 1)
-                ON CONFLICT(month) DO UPDATE SET count = count + 1
-            """, (current_month,))
-            conn.commit()
+        with get_db_connection(write=True) as conn:
+            conn.execute(_SQL_RELEASE_POST_SLOT, (get_current_month(),))
             return True
     except sqlite3.Error as e:
-        logging.error(f"Failed to increment post count: {e}")
+        logging.error(f"Failed to release post slot: {e}")
         return False
 
 # =============================================================================
 # Posted Tweets Operations (Duplicate Prevention)
 # =============================================================================
 
-def get_content_hash(content: str) -> str:
-    """Generate a simple hash for tweet content."""
-    import hashlib
-    return hashlib.md5(content.encode()).hexdigest()
+def get_content_hash(content: str) -> bytes:
+    """Generate a 128-bit BLAKE2b digest for tweet content."""
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+def get_legacy_content_hash(content: str) -> bytes:
+    """MD5 digest used for rows recorded before the switch to BLAKE2b."""
+    return hashlib.md5(content.encode('utf-8')).digest()
+
+# SimHash near-duplicate detection: two tweets are treated as the same when
+# their 64-bit fingerprints differ in at most SIMHASH_MAX_DISTANCE bits.
+# With four 16-bit bands, any such pair shares at least one band exactly.
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SIMHASH_MAX_DISTANCE = 3
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_SIMHASH_MASK = (1 << SIMHASH_BITS) - 1
+_WORD_RE = re.compile(r"\w+")
+
+def get_simhash(content: str) -> Optional[int]:
+    """
+    Generate a 64-bit SimHash over word 3-gram shingles of the content.
+    Returns None when there are no words (e.g. emoji-only tweets), since an
+    empty fingerprint would match every other empty one.
+    """
+    words = _WORD_RE.findall(content.lower())
+    if not words:
+        return None
+    if len(words) >= 3:
+        shingles = [' '.join(words[i:i + 3]) for i in range(len(words) - 2)]
+    else:
+        shingles = words
+    
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    
+    simhash = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            simhash |= 1 << bit
+    return simhash
+
+def get_simhash_bands(simhash: int) -> Tuple[int, ...]:
+    """Split a SimHash into its 16-bit band keys."""
+    return tuple((simhash >> (i * _BAND_BITS)) & _BAND_MASK for i in range(SIMHASH_BANDS))
+
+def _to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER range."""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
 
 def has_posted_before(content: str) -> bool:
-    """Check if similar content has been posted before."""
+    """Check if identical or near-identical content has been posted before."""
     content_hash = get_content_hash(content)
+    simhash = get_simhash(content)
     with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM posted_tweets WHERE content_hash=?", (content_hash,))
-        return c.fetchone() is not None
+        legacy_hash = get_legacy_content_hash(content)
+        if conn.execute(_SQL_HAS_POSTED, (content_hash, legacy_hash)).fetchone() is not None:
+            return True
+        if simhash is None:
+            return False
+        
+        bands = get_simhash_bands(simhash)
+        for row in conn.execute(_SQL_SIMILAR_FINGERPRINTS, bands):
+            distance = bin((row['simhash'] & _SIMHASH_MASK) ^ simhash).count('1')
+            if distance <= SIMHASH_MAX_DISTANCE:
+                return True
+        return False
 
 def record_posted_tweet(content: str, tweet_id: str) -> bool:
-    """Record a posted tweet to prevent duplicates."""
+    """Record a posted tweet and its fingerprint to prevent duplicates."""
     try:
         content_hash = get_content_hash(content)
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR IGNORE INTO posted_tweets (content_hash, tweet_id) VALUES (?, ?)",
-                (content_hash, tweet_id)
-            )
-            conn.commit()
+        simhash = get_simhash(content)
+        # Tweet row and fingerprint commit together or not at all
+        with db_pool.pool.transaction() as conn:
+            c = conn.execute(_SQL_RECORD_POSTED, (content_hash, tweet_id))
+            if c.rowcount == 1 and simhash is not None:
+                conn.execute(
+                    _SQL_RECORD_FINGERPRINT,
+                    (c.lastrowid, _to_signed64(simhash)) + get_simhash_bands(simhash)
+                )
             return True
     except sqlite3.Error as e:
         logging.error(f"Failed to record posted tweet: {e}")
@@ -144,20 +318,13 @@ def record_posted_tweet(content: str, tweet_id: str) -> bool:
 def has_processed_mention(tweet_id: str) -> bool:
     """Check if a mention has been processed before."""
     with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM processed_mentions WHERE tweet_id=?", (tweet_id,))
-        return c.fetchone() is not None
+        return conn.execute(_SQL_HAS_PROCESSED_MENTION, (tweet_id,)).fetchone() is not None
 
 def mark_mention_processed(tweet_id: str, author_id: str = None, author_username: str = None) -> bool:
     """Mark a mention as processed."""
     try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR IGNORE INTO processed_mentions (tweet_id, author_id, author_username) VALUES (?, ?, ?)",
-                (tweet_id, author_id, author_username)
-            )
-            conn.commit()
+        with get_db_connection(write=True) as conn:
+            conn.execute(_SQL_MARK_MENTION_PROCESSED, (tweet_id, author_id, author_username))
             return True
     except sqlite3.Error as e:
         logging.error(f"Failed to mark mention as processed: {e}")
@@ -170,20 +337,13 @@ def mark_mention_processed(tweet_id: str, author_id: str = None, author_username
 def has_retweeted(tweet_id: str) -> bool:
     """Check if a tweet has been retweeted before."""
     with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM retweet_log WHERE original_tweet_id=?", (tweet_id,))
-        return c.fetchone() is not None
+        return conn.execute(_SQL_HAS_RETWEETED, (tweet_id,)).fetchone() is not None
 
 def record_retweet(tweet_id: str, is_quote: bool = False) -> bool:
     """Record a retweet to prevent duplicates."""
     try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR IGNORE INTO retweet_log (original_tweet_id, is_quote_retweet) VALUES (?, ?)",
-                (tweet_id, is_quote)
-            )
-            conn.commit()
+        with get_db_connection(write=True) as conn:
+            conn.execute(_SQL_RECORD_RETWEET, (tweet_id, is_quote))
             return True
     except sqlite3.Error as e:
         logging.error(f"Failed to record retweet: {e}")
@@ -196,28 +356,11 @@ def record_retweet(tweet_id: str, is_quote: bool = False) -> bool:
 def get_bot_stats() -> dict:
     """Get bot statistics."""
     with get_db_connection() as conn:
-        c = conn.cursor()
-        
-        # Current month posts
-        c.execute("SELECT count FROM post_counts WHERE month=?", (get_current_month(),))
-        result = c.fetchone()
-        current_month_posts = result['count'] if result else 0
-        
-        # Total tweets ever
-        c.execute("SELECT COUNT(*) as total FROM posted_tweets")
-        total_tweets = c.fetchone()['total']
-        
-        # Total mentions processed
-        c.execute("SELECT COUNT(*) as total FROM processed_mentions")
-        total_mentions = c.fetchone()['total']
-        
-        # Total retweets
-        c.execute("SELECT COUNT(*) as total FROM retweet_log")
-        total_retweets = c.fetchone()['total']
+        result = conn.execute(_SQL_BOT_STATS, (get_current_month(),)).fetchone()
         
         return {
-            'current_month_posts': current_month_posts,
-            'total_tweets': total_tweets,
-            'total_mentions_processed': total_mentions,
-            'total_retweets': total_retweets
+            'current_month_posts': result['current_month_posts'] or 0,
+            'total_tweets': result['total_tweets'],
+            'total_mentions_processed': result['total_mentions'],
+            'total_retweets': result['total_retweets']
         }
@@ -0,0 +1,155 @@
+"""
+SQLite connection pool for X Bot Agent.
+Keeps one writer connection plus a bounded set of reader connections so
+concurrent bot actions can read in parallel under WAL.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from config import DB_NAME
+
+DEFAULT_MAX_CONNECTIONS = 4
+STATEMENT_CACHE_SIZE = 256
+
+
+def _connect(db_name: str) -> sqlite3.Connection:
+    """Open a connection configured for WAL and shared across threads."""
+    conn = sqlite3.connect(
+        db_name,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row  # Enable dict-like access
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+
+    Reads are served by up to ``max_connections`` reader connections, created
+    lazily. All writes go through a single writer connection guarded by a
+    lock, since SQLite only allows one writer at a time anyway. A thread
+    inside transaction() keeps the writer for every read and write until
+    the transaction ends, so it sees its own uncommitted changes.
+    """
+
+    def __init__(self, db_name: str, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        self.db_name = db_name
+        self.max_connections = max_connections
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=max_connections)
+        self._all_readers: List[sqlite3.Connection] = []
+        self._create_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a reader connection, opening a new one if under the limit."""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._create_lock:
+            if len(self._all_readers) < self.max_connections:
+                conn = _connect(self.db_name)
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a reader connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._readers.put_nowait(conn)
+
+    def acquire_writer(self) -> sqlite3.Connection:
+        """Take exclusive ownership of the writer connection."""
+        self._write_lock.acquire()
+        try:
+            if self._writer is None:
+                self._writer = _connect(self.db_name)
+        except BaseException:
+            self._write_lock.release()
+            raise
+        return self._writer
+
+    def release_writer(self, conn: sqlite3.Connection):
+        """Give up ownership of the writer connection."""
+        if conn.in_transaction and not self.in_transaction():
+            conn.rollback()
+        self._write_lock.release()
+
+    def in_transaction(self) -> bool:
+        """True if the calling thread is inside transaction()."""
+        return getattr(self._local, 'depth', 0) > 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the writer inside one BEGIN IMMEDIATE ... COMMIT.
+        Rolls back on exception. Nested calls run in a savepoint of the outer
+        transaction, so a failing nested block undoes only its own changes.
+        """
+        conn = self.acquire_writer()
+        depth = getattr(self._local, 'depth', 0)
+        savepoint = f"sp_{depth}"
+        self._local.depth = depth + 1
+        try:
+            conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+            yield conn
+            conn.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+        except BaseException:
+            if conn.in_transaction:
+                if depth == 0:
+                    conn.rollback()
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+            raise
+        finally:
+            self._local.depth -= 1
+            self.release_writer(conn)
+
+    def close_all(self):
+        """Close every connection opened by the pool."""
+        with self._create_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+pool = ConnectionPool(DB_NAME)
+atexit.register(pool.close_all)
+
+
+@contextmanager
+def get_db_connection(write: bool = False):
+    """
+    Borrow a connection from the pool.
+    Pass write=True for INSERT/UPDATE/DDL so the statement runs on the writer.
+    Inside pool.transaction() every call uses the writer.
+    """
+    if write or pool.in_transaction():
+        conn = pool.acquire_writer()
+        try:
+            yield conn
+        finally:
+            pool.release_writer(conn)
+    else:
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
@@ -0,0 +1,17 @@
+"""
+Logging setup for X Bot Agent.
+Call configure_logging() once from the entry point before doing any work.
+"""
+import logging
+from config import LOG_FILE
+
+_configured = False
+
+
+def configure_logging():
+    """Send error logs to LOG_FILE. Safe to call more than once."""
+    global _configured
+    if _configured:
+        return
+    logging.basicConfig(filename=LOG_FILE, level=logging.ERROR)
+    _configured = True
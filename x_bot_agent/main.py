@@ -11,6 +11,7 @@ import sys
 from database import init_db, get_bot_stats
 from post_tweet import post_tweet, generate_tweet, copilot_mode
 from config import RATE_LIMIT_MAX
+from logging_config import configure_logging
 
 
 def show_banner():
@@ -73,9 +74,6 @@ def cmd_stats(args):
 
 def main():
     """Main entry point."""
-    # Initialize database
-    init_db()
-    
     # Create argument parser
     parser = argparse.ArgumentParser(
         description="X Bot Agent - AI-Powered Twitter Bot (Free Tier)",
@@ -115,6 +113,10 @@ Examples:
         parser.print_help()
         return 0
     
+    # Set up logging and the database only once there is work to do
+    configure_logging()
+    init_db()
+    
     # Execute command
     return args.func(args)
 
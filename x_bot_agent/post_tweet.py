@@ -2,15 +2,20 @@
 Tweet posting module with AI generation and rate limiting.
 """
 import logging
+import re
 from typing import Optional
-from config import get_x_client, get_gemini_model, PROMPTS, RATE_LIMIT_THRESHOLD, RATE_LIMIT_MAX, LOG_FILE
+from config import get_x_client, get_gemini_model, PROMPTS, RATE_LIMIT_THRESHOLD, RATE_LIMIT_MAX
 from database import (
-    init_db, get_post_count, increment_post_count, 
+    init_db, get_post_count, reserve_post_slot, release_post_slot,
     has_posted_before, record_posted_tweet
 )
+from logging_config import configure_logging
 
-# Configure logging
-logging.basicConfig(filename=LOG_FILE, level=logging.ERROR)
+# Prompt prefix is fixed at import, so only the topic is appended per call
+_GENERATE_TWEET_PREFIX = PROMPTS['generate_tweet'] + ' '
+
+# Leading/trailing whitespace and quotes the model tends to wrap tweets in
+_TRIM = re.compile(r'^[\s"\']+|[\s"\']+$')
 
 
 def generate_tweet(topic: str) -> Optional[str]:
@@ -20,23 +25,17 @@ def generate_tweet(topic: str) -> Optional[str]:
     """
     try:
         model = get_gemini_model()
-        prompt = f"{PROMPTS['generate_tweet']} {topic}"
+        prompt = _GENERATE_TWEET_PREFIX + topic
         response = model.generate_content(prompt)
         
-        if not response or not response.text:
+        text = response.text if response else None  # .text is rebuilt on each access
+        if not text:
             print("Error: AI returned empty response")
             return None
             
-        generated_text = response.text.strip()
-        
-        # Clean up common issues
-        generated_text = generated_text.strip('"\'')  # Remove wrapping quotes
-        
-        # Truncate if too long
-        if len(generated_text) > 280:
-            generated_text = generated_text[:277] + "..."
-            
-        return generated_text
+        # Trim whitespace and wrapping quotes, then truncate if too long
+        text = _TRIM.sub('', text)
+        return (text[:277] + "...") if len(text) > 280 else text
         
     except Exception as e:
         error_msg = f"Error generating tweet: {e}"
@@ -57,13 +56,15 @@ def post_tweet(message: str, require_approval: bool = True) -> Optional[dict]:
         The API response object or None on failure
     """
     try:
-        # Validate message
-        if not message or len(message.strip()) == 0:
+        # Validate message (surrounding whitespace is not part of the tweet)
+        message = message.strip() if message else ''
+        length = len(message)
+        if not message:
             print("❌ Error: Empty message cannot be posted")
             return None
             
-        if len(message) > 280:
-            print(f"❌ Error: Message exceeds 280 character limit ({len(message)} characters)")
+        if length > 280:
+            print(f"❌ Error: Message exceeds 280 character limit ({length} characters)")
             return None
 
         # Rate limit check
@@ -86,7 +87,7 @@ def post_tweet(message: str, require_approval: bool = True) -> Optional[dict]:
             print("-"*60)
             print(message)
             print("-"*60)
-            print(f"Length: {len(message)}/280 characters")
+            print(f"Length: {length}/280 characters")
             print(f"Posts this month: {current_count}/{RATE_LIMIT_MAX}")
             print("="*60)
             
@@ -95,16 +96,26 @@ def post_tweet(message: str, require_approval: bool = True) -> Optional[dict]:
                 print("❌ Tweet posting cancelled.")
                 return None
                 
-        # Post the tweet
-        client = get_x_client()
-        response = client.create_tweet(text=message)
+        # Claim a slot atomically so concurrent runs cannot exceed the limit
+        new_count = reserve_post_slot(RATE_LIMIT_MAX)
+        if new_count is None:
+            print(f"🚫 Monthly post limit reached ({RATE_LIMIT_MAX}/{RATE_LIMIT_MAX}). Cannot post.")
+            return None
+        
+        # Post the tweet, handing the slot back if it does not go out
+        try:
+            client = get_x_client()
+            response = client.create_tweet(text=message)
+        except Exception:
+            release_post_slot()
+            raise
         tweet_id = response.data['id']
         
         print(f"✅ Successfully posted tweet!")
         print(f"🔗 https://x.com/i/web/status/{tweet_id}")
+        print(f"📝 Posts this month: {new_count}/{RATE_LIMIT_MAX}")
         
         # Update tracking
-        increment_post_count()
         record_posted_tweet(message, tweet_id)
         
         return response
@@ -142,6 +153,7 @@ def copilot_mode(topic: str):
 
 
 if __name__ == "__main__":
+    configure_logging()
     init_db()
     # Example: copilot mode
     topic = input("Enter a topic for your tweet: ")